@@ -13,6 +13,7 @@ from typing import Optional, List, Dict, Any
 # Add parent directory to path and import local logger
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from logger import stock_logger, logs_logger, important_logger
+from stock_tracking.anomalies import AnomalyDetector
 
 # Import settings from parent directory
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -27,6 +28,8 @@ important_egg = settings.important_egg
 gear_seeds_minutes = settings.gear_seeds_minutes
 eggs_minutes = settings.eggs_minutes
 
+anomaly_detector = AnomalyDetector()
+
 
 def is_important(item_list, important_items, item_type="Item"):
     for item in item_list:
@@ -40,6 +43,16 @@ def is_important(item_list, important_items, item_type="Item"):
                 tags="important,stock",
             )
 
+def report_anomalies(item_list, category, timestamp, item_type="Item"):
+    for event in anomaly_detector.update(category, item_list, timestamp):
+        important_logger.info(f"📈 {item_type} anomaly (score {event['score']}): {event['message']}\n")
+        send_notification(
+            message=f"📈 {event['message']}",
+            title=f"{item_type} Stock Anomaly",
+            priority=3,
+            tags="anomaly,stock",
+        )
+
 def send_notification(
     message: str,
     title: Optional[str] = None,
@@ -132,8 +145,9 @@ def validate_response(data, data_type):
     
     return True
 
-def get_daily_stock_folder():
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
+def get_daily_stock_folder(timestamp):
+    """Get the UTC partition folder for an epoch timestamp (create it if needed)"""
+    today = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y-%m-%d")
     stocks_dir = os.path.join(os.path.dirname(__file__), "stock_tracking", "stocks")
     daily_dir = os.path.join(stocks_dir, today)
     
@@ -155,10 +169,10 @@ def fetch_seeds():
         stock_logger.info(f"Seeds that are in stock:\n{seed_list}")
 
         # Write the data to daily folder
-        daily_dir = get_daily_stock_folder()
-        timestamp = datetime.datetime.now().isoformat()
+        timestamp = int(time.time())
+        daily_dir = get_daily_stock_folder(timestamp)
         data_to_write = {
-            timestamp: [
+            str(timestamp): [
                 {
                     "name": item["name"],
                     "quantity": item["quantity"]
@@ -172,6 +186,9 @@ def fetch_seeds():
 
         # Check for important seeds
         is_important(seeds, important_seeds, item_type="Seed")
+
+        # Check for unusual stock
+        report_anomalies(seeds, "seeds", timestamp, item_type="Seed")
     except requests.exceptions.RequestException as e:
         logs_logger.error(f"Error fetching seeds: {e}")
     except Exception as e:
@@ -190,10 +207,10 @@ def fetch_gear():
         stock_logger.info(f"Gear that is in stock:\n{gear_list}")
         
         # Write the data to daily folder
-        daily_dir = get_daily_stock_folder()
-        timestamp = datetime.datetime.now().isoformat()
+        timestamp = int(time.time())
+        daily_dir = get_daily_stock_folder(timestamp)
         data_to_write = {
-            timestamp: [
+            str(timestamp): [
                 {
                     "name": item["name"],
                     "quantity": item["quantity"]
@@ -207,6 +224,9 @@ def fetch_gear():
 
         # Check for important gear
         is_important(gear, important_gear, item_type="Gear")
+
+        # Check for unusual stock
+        report_anomalies(gear, "gear", timestamp, item_type="Gear")
     except requests.exceptions.RequestException as e:
         logs_logger.error(f"Error fetching gear: {e}")
     except Exception as e:
@@ -225,10 +245,10 @@ def fetch_eggs():
         stock_logger.info(f"Eggs that are in stock:\n{egg_list}")
 
         # Write the data to daily folder
-        daily_dir = get_daily_stock_folder()
-        timestamp = datetime.datetime.now().isoformat()
+        timestamp = int(time.time())
+        daily_dir = get_daily_stock_folder(timestamp)
         data_to_write = {
-            timestamp: [
+            str(timestamp): [
                 {
                     "name": item["name"],
                     "quantity": item["quantity"]
@@ -242,6 +262,9 @@ def fetch_eggs():
 
         # Check for important eggs
         is_important(eggs, important_egg, item_type="Egg")
+
+        # Check for unusual stock
+        report_anomalies(eggs, "eggs", timestamp, item_type="Egg")
     except requests.exceptions.RequestException as e:
         logs_logger.error(f"Error fetching eggs: {e}")
     except Exception as e:
@@ -265,12 +288,14 @@ def main():
     global last_gear_seeds_run, last_eggs_run
     
     daily_time = getattr(settings, 'daily_stats_time', '00:01')
-    schedule.every().day.at(daily_time).do(daily_statistics_job)
+    report_timezone = getattr(settings, 'report_timezone', 'UTC')
+    # Run on the report time zone's clock so "yesterday" matches get_report_date()
+    schedule.every().day.at(daily_time, report_timezone).do(daily_statistics_job)
 
     logs_logger.info(f"API URL: {api_url}")
     logs_logger.info(f"Gear/Seeds schedule: {sorted(gear_seeds_minutes)}")
     logs_logger.info(f"Eggs schedule: {sorted(eggs_minutes)}")
-    logs_logger.info(f"Daily statistics scheduled at: {daily_time}")
+    logs_logger.info(f"Daily statistics scheduled at: {daily_time} ({report_timezone})")
     
     while True:
         # Run scheduled jobs
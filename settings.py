@@ -36,4 +36,25 @@ important_egg = [
 # These sets define the minutes at which requests will be made.
 # For example, if you want to make requests every 5 minutes, you can use {0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55}.
 gear_seeds_minutes = {0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55}
-eggs_minutes = {0, 30}
\ No newline at end of file
+eggs_minutes = {0, 30}
+
+# 🕒 Time zone for daily reports
+# Snapshots are always stored in UTC folders (stock_tracking/stocks/YYYY-MM-DD) with epoch timestamps.
+# Daily statistics are computed for calendar days in this time zone, e.g. "Europe/Berlin" or "America/New_York".
+# The daily statistics job also runs on this time zone's clock.
+report_timezone = "UTC"
+
+
+# 📈 Anomaly detection
+# Each item keeps rolling (EWMA) statistics of its quantity and how often it appears.
+# An alert is sent when a snapshot scores at least anomaly_threshold standard deviations away,
+# e.g. unusually high quantity, or a common item missing for several restocks in a row (once per absence).
+# A rare item appearing twice within anomaly_restock_window seconds alerts when the chance of that is below anomaly_restock_probability.
+# Each item alerts at most once per anomaly_cooldown seconds.
+anomaly_alpha = 0.01
+anomaly_rate_alpha = 0.005
+anomaly_threshold = 3.0
+anomaly_min_samples = 24
+anomaly_restock_window = 3600
+anomaly_restock_probability = 0.03
+anomaly_cooldown = 3600
\ No newline at end of file
@@ -0,0 +1,197 @@
+import json
+import math
+import sys
+import os
+from statistics import NormalDist
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from logger import logs_logger
+import settings
+
+
+# ⚙️ Detector settings (can be overridden in settings.py)
+alpha = getattr(settings, 'anomaly_alpha', 0.01)
+rate_alpha = getattr(settings, 'anomaly_rate_alpha', 0.005)
+threshold = getattr(settings, 'anomaly_threshold', 3.0)
+min_samples = getattr(settings, 'anomaly_min_samples', 24)
+restock_window = getattr(settings, 'anomaly_restock_window', 3600)
+restock_probability = getattr(settings, 'anomaly_restock_probability', 0.03)
+cooldown = getattr(settings, 'anomaly_cooldown', 3600)
+
+# Most samples the rate's Wilson interval is credited with, so a long history
+# doesn't make a run of misses from a fairly common item look impossible
+effective_samples = min((2 - rate_alpha) / rate_alpha, 100)
+# z of the 95% Wilson interval used to judge appearance rates
+rate_confidence = 1.96
+
+state_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'anomaly_state.json')
+
+
+class ItemStats:
+    """Rolling EWMA statistics for one item, constant size"""
+    __slots__ = ("mean", "var", "rate", "samples", "appearances", "last_seen", "missed", "last_alert",
+                 "vanished_alerted")
+
+    def __init__(self, mean=0.0, var=0.0, rate=0.0, samples=0, appearances=0, last_seen=None, missed=0,
+                 last_alert=None, vanished_alerted=False):
+        self.mean = mean
+        self.var = var
+        self.rate = rate
+        self.samples = samples
+        self.appearances = appearances
+        self.last_seen = last_seen
+        self.missed = missed
+        self.last_alert = last_alert
+        self.vanished_alerted = vanished_alerted
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+class AnomalyDetector:
+    """Streaming detector that scores each stock snapshot against per-item EWMA statistics"""
+
+    def __init__(self, path=state_path):
+        self.path = path
+        self.stats = {}
+        self.load()
+
+    def load(self):
+        """Load saved statistics so a restart doesn't start cold"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.stats = {
+                category: {name: ItemStats(**values) for name, values in items.items()}
+                for category, items in data.items()
+            }
+        except Exception as e:
+            self.stats = {}
+            logs_logger.error(f"Error loading anomaly state: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            data = {
+                category: {name: stats.to_dict() for name, stats in items.items()}
+                for category, items in self.stats.items()
+            }
+            # Replace the file atomically so a kill mid-write can't leave truncated JSON
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logs_logger.error(f"Error saving anomaly state: {e}")
+
+    def update(self, category, item_list, timestamp):
+        """
+        Update statistics with one snapshot and return scored anomaly events.
+
+        Each event is a dict with "kind" ("high_quantity", "vanished" or "rare_restock"),
+        "name", "score" and a human readable "message". Each item raises at most one event per cooldown.
+        """
+        category_stats = self.stats.setdefault(category, {})
+        quantities = {}
+        for item in item_list:
+            if isinstance(item, dict) and "name" in item and "quantity" in item:
+                quantities[item["name"]] = quantities.get(item["name"], 0) + item["quantity"]
+
+        events = []
+        for name in set(category_stats) | set(quantities):
+            stats = category_stats.get(name)
+            if stats is None:
+                stats = category_stats[name] = ItemStats()
+            present = name in quantities
+            warm = stats.samples >= min_samples
+            item_events = []
+
+            # Score against the statistics before this snapshot is folded in
+            if warm and present:
+                # Quantities are whole numbers, so don't let a flat history make every +1 an anomaly
+                std = max(math.sqrt(stats.var), 1.0)
+                score = (quantities[name] - stats.mean) / std
+                if stats.appearances >= min_samples and score >= threshold:
+                    item_events.append(self._event(
+                        "high_quantity", name, score,
+                        f"Unusually high quantity: {name} x{quantities[name]} (usually ~{stats.mean:.0f})"
+                    ))
+                gap = timestamp - stats.last_seen if stats.last_seen is not None else None
+                if gap and gap <= restock_window:
+                    # Chance of two or more appearances in one window of snapshots at the item's rate,
+                    # leaving the previous appearance out of the rate since the tail already counts it
+                    window = max(round(restock_window * (stats.missed + 1) / gap), 2)
+                    rate = max(stats.rate - rate_alpha * (1 - rate_alpha) ** stats.missed, 0.0001)
+                    probability = self._restock_probability(rate, window)
+                    score = self._probability_score(probability)
+                    minutes = gap // 60
+                    if probability <= restock_probability:
+                        item_events.append(self._event(
+                            "rare_restock", name, score,
+                            f"Rare item restocked again: {name} (last seen {minutes} min ago)"
+                        ))
+                    elif probability <= 2 * restock_probability:
+                        logs_logger.debug(f"Rare {category} item in stock: {name} (last seen {minutes} min ago)")
+            elif warm and not stats.vanished_alerted:
+                # Chance of missing this many snapshots in a row, taking the rate at its low end
+                rate, _ = self._rate_bounds(stats)
+                score = self._probability_score((1 - rate) ** (stats.missed + 1))
+                if score >= threshold:
+                    item_events.append(self._event(
+                        "vanished", name, score,
+                        f"Common item missing: {name} (appears in {stats.rate:.0%} of restocks)"
+                    ))
+
+            if item_events and (stats.last_alert is None or timestamp - stats.last_alert >= cooldown):
+                events.extend(item_events)
+                stats.last_alert = timestamp
+                # One "vanished" alert per absence, armed again once the item is back
+                if any(event["kind"] == "vanished" for event in item_events):
+                    stats.vanished_alerted = True
+
+            # Fold the snapshot into the rolling statistics
+            # Plain average until the EWMA has enough history, so the rate doesn't start biased
+            weight = max(rate_alpha, 1.0 / (stats.samples + 1))
+            stats.rate += weight * ((1.0 if present else 0.0) - stats.rate)
+            stats.samples += 1
+            stats.missed = 0 if present else stats.missed + 1
+            if present:
+                stats.vanished_alerted = False
+                stats.appearances += 1
+                weight = max(alpha, 1.0 / stats.appearances)
+                diff = quantities[name] - stats.mean
+                increment = weight * diff
+                stats.mean += increment
+                stats.var = (1 - weight) * (stats.var + diff * increment)
+                stats.last_seen = timestamp
+
+        self.save()
+        return sorted(events, key=lambda event: event["score"], reverse=True)
+
+    @staticmethod
+    def _rate_bounds(stats):
+        """Wilson interval of the appearance rate"""
+        n = min(stats.samples, effective_samples)
+        z = rate_confidence
+        centre = (stats.rate + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z * math.sqrt(stats.rate * (1 - stats.rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(centre - margin, 0.0), min(centre + margin, 1.0)
+
+    @staticmethod
+    def _restock_probability(rate, window):
+        """Binomial chance of at least two appearances in a window of snapshots"""
+        return 1 - (1 - rate) ** window - window * rate * (1 - rate) ** (window - 1)
+
+    @staticmethod
+    def _probability_score(probability):
+        """Convert the chance of an observation into standard deviations, like the quantity score"""
+        probability = min(max(probability, 1e-12), 0.5)
+        return NormalDist().inv_cdf(1 - probability)
+
+    @staticmethod
+    def _event(kind, name, score, message):
+        return {"kind": kind, "name": name, "score": round(score, 2), "message": message}
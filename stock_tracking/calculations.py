@@ -4,10 +4,14 @@ import os
 import requests
 from tabulate import tabulate
 from collections import defaultdict, Counter
-from datetime import datetime, timedelta
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone, time as dt_time
+from zoneinfo import ZoneInfo
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from logger import stock_logger, logs_logger, important_logger
+import settings
 
 
 seed_names = [
@@ -69,81 +73,157 @@ egg_names = [
 
 stock_history = {}
 
-def get_daily_stock_folder():
-    """Get daily stock folder (don't create it)"""
-    yesterday = datetime.now() - timedelta(days=1)
-    today = yesterday.strftime("%Y-%m-%d")
+STOCK_FILES = {
+    "seeds": "seeds_stock.txt",
+    "gear": "gear_stock.txt",
+    "eggs": "eggs_stock.txt"
+}
+
+def get_report_timezone():
+    """Get the time zone daily reports are computed in"""
+    return ZoneInfo(getattr(settings, 'report_timezone', 'UTC'))
+
+def get_report_date():
+    """Get the local calendar date the daily report covers (yesterday)"""
+    return (datetime.now(get_report_timezone()) - timedelta(days=1)).date()
+
+def get_day_bounds(day, tz):
+    """Get epoch bounds [start, end) of a local calendar day, DST-aware"""
+    start = datetime.combine(day, dt_time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), dt_time.min, tzinfo=tz)
+    return int(start.timestamp()), int(end.timestamp())
+
+def get_partition_names(start, end):
+    """Get UTC partition folder names overlapping the epoch range [start, end)"""
+    day = datetime.fromtimestamp(start, timezone.utc).date()
+    last_day = datetime.fromtimestamp(end - 1, timezone.utc).date()
+    names = []
+    while day <= last_day:
+        names.append(day.strftime("%Y-%m-%d"))
+        day += timedelta(days=1)
+    return names
+
+def get_daily_stock_folder(day=None):
+    """Get stock folder named after a date (don't create it)"""
+    if day is None:
+        day = get_report_date()
     stocks_dir = os.path.join(os.path.dirname(__file__), "stocks")
-    daily_dir = os.path.join(stocks_dir, today)
+    daily_dir = os.path.join(stocks_dir, day.strftime("%Y-%m-%d"))
     
     return daily_dir
 
-def load_stock_files():
-    """Load stock data from JSON files"""
+def to_epoch(timestamp):
+    """Convert a stored timestamp key to epoch seconds"""
+    try:
+        return int(timestamp)
+    except ValueError:
+        # Legacy snapshots were keyed by naive local ISO timestamps
+        return int(datetime.fromisoformat(timestamp).timestamp())
+
+def has_legacy_records(filepath):
+    """Check whether a stock file starts with ISO-keyed (pre-epoch) snapshots, reading only its first key"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('"'):
+                # Snapshots are appended in time order, so legacy records always come first
+                return not line.split('"')[1].isdigit()
+    return False
+
+def parse_stock_file(filepath):
+    """Parse a stock file of concatenated pretty-printed JSON objects into a list of objects"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+
+    json_objects = []
+    if content:
+        current_json = ""
+        brace_count = 0
+        
+        for line in content.split('\n'):
+            line = line.strip()
+            if line:
+                current_json += line + '\n'
+                brace_count += line.count('{') - line.count('}')
+                
+                if brace_count == 0 and current_json.strip():
+                    try:
+                        obj = json.loads(current_json.strip())
+                        json_objects.append(obj)
+                    except json.JSONDecodeError:
+                        pass
+                    current_json = ""
+    
+    return json_objects
+
+def load_stock_files(day=None):
+    """Load stock data from the UTC partitions covering a local report day"""
     global stock_history
-    daily_dir = get_daily_stock_folder()
+    if day is None:
+        day = get_report_date()
+    start, end = get_day_bounds(day, get_report_timezone())
+    stocks_dir = os.path.join(os.path.dirname(__file__), "stocks")
+    partitions = get_partition_names(start, end)
+    # Legacy folders were named by the host's local date, so their records near
+    # midnight can sit in a neighbouring folder; only ISO-keyed records are taken from those,
+    # and only files that start with them are parsed at all
+    neighbours = [
+        name for name in get_partition_names(start - 86400, end + 86400)
+        if name not in partitions
+    ]
+    daily_dirs = [
+        os.path.join(stocks_dir, name)
+        for name in partitions
+        if os.path.exists(os.path.join(stocks_dir, name))
+    ]
+    legacy_dirs = [
+        os.path.join(stocks_dir, name)
+        for name in neighbours
+        if os.path.exists(os.path.join(stocks_dir, name))
+    ]
     
-    # Check if daily folder exists first
-    if not os.path.exists(daily_dir):
-        logs_logger.error(f"Daily stock folder not found: {daily_dir}")
-        stock_history = {"seeds": {}, "gear": {}, "eggs": {}}
+    stock_history = {"seeds": {}, "gear": {}, "eggs": {}}
+
+    # Check if any partition exists first
+    if not daily_dirs:
+        logs_logger.error(f"Daily stock folder not found for {day}: {', '.join(get_partition_names(start, end))}")
         return
     
-    stock_files = {
-        "seeds": "seeds_stock.txt",
-        "gear": "gear_stock.txt",
-        "eggs": "eggs_stock.txt"
-    }
-    
     missing_files = []
     
-    for category, filename in stock_files.items():
-        filepath = os.path.join(daily_dir, filename)
-        try:
-            if os.path.exists(filepath):
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-
-                    merged_data = {}
-                    if content:
-                        json_objects = []
-                        current_json = ""
-                        brace_count = 0
-                        
-                        for line in content.split('\n'):
-                            line = line.strip()
-                            if line:
-                                current_json += line + '\n'
-                                brace_count += line.count('{') - line.count('}')
-                                
-                                if brace_count == 0 and current_json.strip():
-                                    try:
-                                        obj = json.loads(current_json.strip())
-                                        json_objects.append(obj)
-                                    except json.JSONDecodeError:
-                                        pass
-                                    current_json = ""
-                        
-                        # Merge all objects
-                        for obj in json_objects:
-                            merged_data.update(obj)
-                    
-                    stock_history[category] = merged_data
-                stock_logger.info(f"Loaded {category} stock data: {len(merged_data)} timestamps")
-            else:
-                stock_history[category] = {}
-                missing_files.append(filename)
-        except Exception as e:
-            stock_history[category] = {}
-            logs_logger.error(f"Error loading {category} stock: {e}")
+    for category, filename in STOCK_FILES.items():
+        merged_data = {}
+        for daily_dir in daily_dirs + legacy_dirs:
+            legacy_only = daily_dir in legacy_dirs
+            filepath = os.path.join(daily_dir, filename)
+            try:
+                if legacy_only and not (os.path.exists(filepath) and has_legacy_records(filepath)):
+                    continue
+                if os.path.exists(filepath):
+                    for obj in parse_stock_file(filepath):
+                        for timestamp, items_array in obj.items():
+                            if legacy_only and timestamp.isdigit():
+                                continue
+                            try:
+                                merged_data[to_epoch(timestamp)] = items_array
+                            except (ValueError, TypeError):
+                                continue
+                elif not legacy_only:
+                    missing_files.append(os.path.join(os.path.basename(daily_dir), filename))
+            except Exception as e:
+                logs_logger.error(f"Error loading {category} stock from {daily_dir}: {e}")
+
+        stock_history[category] = dict(sorted(merged_data.items()))
+        stock_logger.info(f"Loaded {category} stock data: {len(merged_data)} timestamps")
 
     if missing_files:
         logs_logger.error(f"Stock files not found: {', '.join(missing_files)}")
 
-def get_todays_items():
+def get_todays_items(day=None):
     """Get items that appeared in shop yesterday with total quantities"""
-    yesterday = datetime.now() - timedelta(days=1)
-    today = yesterday.strftime("%Y-%m-%d")
+    if day is None:
+        day = get_report_date()
+    start, end = get_day_bounds(day, get_report_timezone())
     daily_stats = {"seeds": {}, "gear": {}, "eggs": {}}
     
     for category in ["seeds", "gear", "eggs"]:
@@ -152,55 +232,38 @@ def get_todays_items():
             
         item_quantities = defaultdict(int)
 
-        for timestamp, items_array in stock_history[category].items():
-            try:
-                ts_date = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).strftime("%Y-%m-%d")
-                if ts_date == today:
-                    for item in items_array:
-                        if isinstance(item, dict) and "name" in item and "quantity" in item:
-                            item_name = item["name"]
-                            quantity = item["quantity"]
-                            item_quantities[item_name] += quantity
-            except (ValueError, AttributeError, TypeError):
-                continue
+        # stock_history keys are sorted epoch seconds, so the day is a slice
+        timestamps = list(stock_history[category])
+        first = bisect_left(timestamps, start)
+        last = bisect_left(timestamps, end)
+        for timestamp in timestamps[first:last]:
+            for item in stock_history[category][timestamp]:
+                if isinstance(item, dict) and "name" in item and "quantity" in item:
+                    item_quantities[item["name"]] += item["quantity"]
         
         daily_stats[category] = dict(item_quantities)
     
     return daily_stats
 
+def get_daily_report_file(day=None):
+    """Get the report file for a local report day (don't create it)"""
+    if day is None:
+        day = get_report_date()
+    reports_dir = os.path.join(os.path.dirname(__file__), "reports")
+    return os.path.join(reports_dir, f"{day.strftime('%Y-%m-%d')}.txt")
+
 def write_daily_report_to_files():
-    """Write daily report to the end of each stock file"""
-    daily_dir = get_daily_stock_folder()
+    """Write daily report to its own file in stock_tracking/reports/"""
+    # Reports live outside the UTC partitions, which may still be receiving snapshots
+    report_file = get_daily_report_file()
     
-    if not os.path.exists(daily_dir):
+    if os.path.exists(report_file):
+        logs_logger.info(f"Daily report already exists: {report_file}")
         return
     
-    yesterday = datetime.now() - timedelta(days=1)
-    today_str = yesterday.strftime('%d.%m.%Y')
+    today_str = get_report_date().strftime('%d.%m.%Y')
     daily_stats = get_todays_items()
 
-    stock_files = ["seeds_stock.txt", "gear_stock.txt", "eggs_stock.txt"]
-    existing_files = []
-    
-    for filename in stock_files:
-        filepath = os.path.join(daily_dir, filename)
-        if os.path.exists(filepath):
-            existing_files.append(filename)
-    
-    if not existing_files:
-        return
-
-    for filename in existing_files:
-        filepath = os.path.join(daily_dir, filename)
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if f"DAILY {filename.split('_')[0].upper()} REPORT - {today_str}" in content:
-                    logs_logger.info(f"Daily report already exists in {filename}")
-                    return
-        except Exception:
-            pass
-    
     seeds_report = [
         f"\n\n# DAILY SEEDS REPORT - {today_str}",
         "# " + "=" * 40,
@@ -255,25 +318,13 @@ def write_daily_report_to_files():
     
     eggs_report.append("# " + "=" * 40)
 
-    reports = {
-        "seeds_stock.txt": seeds_report,
-        "gear_stock.txt": gear_report,
-        "eggs_stock.txt": eggs_report
-    }
-    
-    reports_written = 0
-    for filename, report_lines in reports.items():
-        filepath = os.path.join(daily_dir, filename)
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'a', encoding='utf-8') as f:
-                    f.write('\n'.join(report_lines))
-                reports_written += 1
-            except Exception as e:
-                logs_logger.error(f"Error writing daily report to {filename}: {e}")
-    
-    if reports_written > 0:
-        logs_logger.info(f"Daily reports written to {reports_written} files")
+    try:
+        os.makedirs(os.path.dirname(report_file), exist_ok=True)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(seeds_report + gear_report + eggs_report).lstrip('\n') + '\n')
+        logs_logger.info(f"Daily report written to {report_file}")
+    except Exception as e:
+        logs_logger.error(f"Error writing daily report to {report_file}: {e}")
 
 
 def create_daily_statistics():
@@ -287,8 +338,7 @@ def create_daily_statistics():
         logs_logger.info("No stock data available for yesterday - skipping statistics display")
         return
     
-    yesterday = datetime.now() - timedelta(days=1)
-    today_str = yesterday.strftime('%d.%m.%Y')
+    today_str = get_report_date().strftime('%d.%m.%Y')
     print(f"\n📋 DAILY SHOP STATISTICS - {today_str}")
     print("=" * 60)
     
@@ -0,0 +1,321 @@
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from logger import logs_logger
+from stock_tracking.calculations import STOCK_FILES, parse_stock_file, to_epoch
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+stocks_dir = os.path.join(os.path.dirname(__file__), "stocks")
+
+COLUMNS = ["day", "timestamp", "category", "name", "quantity"]
+
+
+def get_stock_days(start=None, end=None):
+    """Get partition dates (YYYY-MM-DD) in stock_tracking/stocks/ within [start, end]"""
+    if not os.path.exists(stocks_dir):
+        return []
+    days = []
+    for name in sorted(os.listdir(stocks_dir)):
+        try:
+            datetime.strptime(name, "%Y-%m-%d")
+        except ValueError:
+            continue
+        if (start is None or name >= start) and (end is None or name <= end):
+            days.append(name)
+    return days
+
+
+def read_day(day):
+    """Read one day partition into rows of (day, timestamp, category, name, quantity)"""
+    daily_dir = os.path.join(stocks_dir, day)
+    rows = []
+    for category, filename in STOCK_FILES.items():
+        filepath = os.path.join(daily_dir, filename)
+        if not os.path.exists(filepath):
+            continue
+        for obj in parse_stock_file(filepath):
+            for timestamp, items_array in obj.items():
+                try:
+                    epoch = to_epoch(timestamp)
+                except (ValueError, TypeError):
+                    continue
+                for item in items_array:
+                    if isinstance(item, dict) and "name" in item and "quantity" in item:
+                        rows.append((day, epoch, category, item["name"], item["quantity"]))
+    rows.sort(key=lambda row: row[1])
+    return rows
+
+
+def read_days(days, workers=None):
+    """Yield (day, rows) in order, parsing days in parallel with a bounded number in flight"""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        window = workers * 2
+        pending = deque()
+        for day in days:
+            pending.append((day, executor.submit(read_day, day)))
+            if len(pending) >= window:
+                day, future = pending.popleft()
+                yield day, future.result()
+        while pending:
+            day, future = pending.popleft()
+            yield day, future.result()
+
+
+class CsvWriter:
+    """Single CSV file, days and the CSV size after them tracked in a <output>.manifest.json sidecar"""
+
+    def __init__(self, path, incremental):
+        self.path = path
+        self.manifest_path = path + ".manifest.json"
+        self.incremental = incremental
+        self.days = set()
+        self.offset = 0
+        self.file = None
+        if incremental and os.path.exists(path):
+            self.days, self.offset = self.read_manifest()
+
+    def read_manifest(self):
+        """Get exported days and the CSV size they end at, rebuilding them from the CSV if needed"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            # Older manifests were a bare list of days without an offset
+            if isinstance(manifest, dict) and manifest["offset"] <= os.path.getsize(self.path):
+                return set(manifest["days"]), manifest["offset"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logs_logger.error(f"Unreadable export manifest {self.manifest_path}, rebuilding it: {e}")
+
+        # Rows are written one whole day at a time, so every day but the last one is complete
+        days = {}
+        offset = 0
+        with open(self.path, 'rb') as f:
+            f.readline()
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                day = line.split(b',', 1)[0].decode('utf-8')
+                days.setdefault(day, offset)
+                offset = f.tell()
+        if days:
+            last_day = max(days, key=days.get)
+            offset = days.pop(last_day)
+        return set(days), offset
+
+    def open(self):
+        if self.incremental and os.path.exists(self.path) and self.offset > 0:
+            # Drop rows of a day that was written but never recorded in the manifest
+            with open(self.path, 'r+b') as f:
+                f.truncate(self.offset)
+            self.file = open(self.path, 'a', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.file)
+        else:
+            if os.path.exists(self.manifest_path):
+                os.remove(self.manifest_path)
+            self.file = open(self.path, 'w', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(COLUMNS)
+
+    def exported_days(self):
+        return self.days
+
+    def write(self, day, rows):
+        if self.file is None:
+            self.open()
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.days.add(day)
+        self.offset = os.path.getsize(self.path)
+
+        # Replace the manifest atomically so a kill mid-write can't leave truncated JSON
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"days": sorted(self.days), "offset": self.offset}, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class SqliteWriter:
+    """SQLite file with a stock table, days tracked in an exported_days table"""
+
+    def __init__(self, path, incremental):
+        self.path = path
+        self.connection = None
+        self.days = set()
+        if incremental and os.path.exists(path):
+            self.open()
+            self.days = {row[0] for row in self.connection.execute("SELECT day FROM exported_days")}
+
+    def open(self):
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS stock (
+                day TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                name TEXT NOT NULL,
+                quantity INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS stock_timestamp ON stock (timestamp);
+            CREATE INDEX IF NOT EXISTS stock_name ON stock (category, name);
+            CREATE TABLE IF NOT EXISTS exported_days (day TEXT PRIMARY KEY);
+        """)
+
+    def exported_days(self):
+        return self.days
+
+    def write(self, day, rows):
+        if self.connection is None:
+            self.open()
+        with self.connection:
+            self.connection.execute("DELETE FROM stock WHERE day = ?", (day,))
+            self.connection.executemany("INSERT INTO stock VALUES (?, ?, ?, ?, ?)", rows)
+            self.connection.execute("INSERT OR IGNORE INTO exported_days VALUES (?)", (day,))
+        self.days.add(day)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class ParquetWriter:
+    """Directory with one <day>.parquet file per day"""
+
+    def __init__(self, path, incremental):
+        self.path = path
+        self.days = set()
+        if incremental and os.path.isdir(path):
+            self.days = {name[:-len(".parquet")] for name in os.listdir(path) if name.endswith(".parquet")}
+
+    def exported_days(self):
+        return self.days
+
+    def write(self, day, rows):
+        os.makedirs(self.path, exist_ok=True)
+        columns = list(zip(*rows)) if rows else [[] for _ in COLUMNS]
+        table = pyarrow.table({
+            "day": pyarrow.array(columns[0], pyarrow.string()),
+            "timestamp": pyarrow.array(columns[1], pyarrow.int64()),
+            "category": pyarrow.array(columns[2], pyarrow.string()),
+            "name": pyarrow.array(columns[3], pyarrow.string()),
+            "quantity": pyarrow.array(columns[4], pyarrow.int64()),
+        })
+        # Write to a temp file first so a crash can't leave a partial <day>.parquet that looks exported
+        filepath = os.path.join(self.path, f"{day}.parquet")
+        pyarrow.parquet.write_table(table, filepath + ".tmp")
+        os.replace(filepath + ".tmp", filepath)
+        self.days.add(day)
+
+    def close(self):
+        pass
+
+
+WRITERS = {
+    "csv": CsvWriter,
+    "sqlite": SqliteWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def export_stocks(output, export_format="csv", start=None, end=None, incremental=False, workers=None):
+    """
+    Export stock snapshots from stock_tracking/stocks/ to CSV, SQLite or Parquet.
+
+    Parameters:
+      - output: Output file (csv, sqlite) or directory (parquet).
+      - export_format: "csv", "sqlite" or "parquet" (requires pyarrow).
+      - start, end: (Optional) Inclusive UTC day range as YYYY-MM-DD. end is at most yesterday,
+        since today's partition is still being written.
+      - incremental: Only export days that are not in the output yet.
+      - workers: (Optional) Number of processes parsing days in parallel.
+
+    Returns the number of days exported, or None if the export failed.
+    The output is only opened once there is a day to write.
+    """
+    if export_format not in WRITERS:
+        logs_logger.error(f"Unknown export format: {export_format}")
+        return None
+    if export_format == "parquet" and pyarrow is None:
+        logs_logger.error("Parquet export requires pyarrow: pip install pyarrow")
+        return None
+    if workers is not None and workers < 1:
+        logs_logger.error(f"Invalid number of export workers: {workers}")
+        return None
+    try:
+        if start is not None:
+            start = datetime.strptime(start, "%Y-%m-%d").strftime("%Y-%m-%d")
+        if end is not None:
+            end = datetime.strptime(end, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError as e:
+        logs_logger.error(f"Invalid export date range: {e}")
+        return None
+
+    # Never export today's partition, it would be recorded as done while still being written
+    yesterday = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
+    if end is None or end > yesterday:
+        if end is not None:
+            logs_logger.info(f"Export end {end} clamped to {yesterday}, today's partition is still being written")
+        end = yesterday
+
+    writer = WRITERS[export_format](output, incremental)
+    try:
+        days = [day for day in get_stock_days(start, end) if day not in writer.exported_days()]
+        if not days:
+            logs_logger.info("No new stock days to export")
+            return 0
+
+        total_rows = 0
+        for day, rows in read_days(days, workers):
+            writer.write(day, rows)
+            total_rows += len(rows)
+            logs_logger.debug(f"Exported {day}: {len(rows)} rows")
+    finally:
+        writer.close()
+
+    logs_logger.info(f"Exported {len(days)} days ({total_rows} rows) to {output}")
+    return len(days)
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stock history for external analysis")
+    parser.add_argument("output", help="Output file (csv, sqlite) or directory (parquet)")
+    parser.add_argument("--format", dest="export_format", choices=sorted(WRITERS), default="csv")
+    parser.add_argument("--start", help="First UTC day to export (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last UTC day to export (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument("--incremental", action="store_true", help="Only export days not exported yet")
+    parser.add_argument("--workers", type=positive_int, help="Number of parallel processes")
+    args = parser.parse_args()
+
+    exported = export_stocks(args.output, args.export_format, args.start, args.end, args.incremental, args.workers)
+    if exported is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()